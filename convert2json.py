@@ -1,54 +1,138 @@
 import asyncio
-import PyPDF2
-import json
+import math
+import multiprocessing
+import threading
+import pypdfium2 as pdfium
+import orjson
 import datetime
 import argparse
 import logging
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from src.loadyaml import load_yaml
 from src.config import load_config
+from src.jsonio import write_json_atomic
 
-from src.llm_client import LLMClient
+from src.llm_client import BatchingLLMClient, LLMClient
 from src.section_segmenter import SectionSegmenter
 from src.extractor import Extractor
 
 logger = logging.getLogger(__name__)
 
+# PDFium is not thread-safe; in-process calls are serialized when bulk runs extract from worker threads
+_PDFIUM_LOCK = threading.Lock()
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    with open(pdf_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        text = ""
-        for i, page in enumerate(reader.pages):
-            text += f"\n--- PAGE {i + 1} ---\n"
-            text += page.extract_text() or ""
+
+# pages per worker task, so streamed pages arrive in small ordered batches
+_PAGES_PER_TASK = 16
+
+def _read_page(pdf: pdfium.PdfDocument, index: int) -> str:
+    with _PDFIUM_LOCK:
+        page = pdf[index]
+        textpage = page.get_textpage()
+        text = textpage.get_text_range()
+        textpage.close()
+        page.close()
     return text
 
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) using a dedicated document handle"""
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        return [_read_page(pdf, i) for i in range(start, stop)]
+    finally:
+        with _PDFIUM_LOCK:
+            pdf.close()
+
+def make_page_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Worker pool for page extraction; create one and pass it to iter_pages to share it across PDFs"""
+    # spawn rather than fork: a forked child could inherit _PDFIUM_LOCK held by another thread
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+def iter_pages(pdf_path: str, max_workers: int = 1,
+               executor: Optional[ProcessPoolExecutor] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_no, text) in page order without holding the whole document text in memory.
+    With max_workers > 1, pages are extracted on `executor`, or on a pool created for this call.
+    """
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_path)
+        n_pages = len(pdf)
+
+    # PDFium is not thread-safe, so pages are split into contiguous ranges handled by worker processes
+    workers = max(1, min(max_workers or 1, n_pages))
+    if workers == 1:
+        try:
+            for i in range(n_pages):
+                yield i + 1, _read_page(pdf, i)
+        finally:
+            with _PDFIUM_LOCK:
+                pdf.close()
+        return
+
+    with _PDFIUM_LOCK:
+        pdf.close()
+
+    step = min(math.ceil(n_pages / workers), _PAGES_PER_TASK)
+    starts = range(0, n_pages, step)
+    stops = [min(start + step, n_pages) for start in starts]
+    with (make_page_pool(workers) if executor is None else nullcontext(executor)) as pool:
+        page_no = 0
+        for chunk in pool.map(_extract_page_range, repeat(pdf_path), starts, stops):
+            for text in chunk:
+                page_no += 1
+                yield page_no, text
+
+def _page_block(page_no: int, text: str) -> str:
+    return f"\n--- PAGE {page_no} ---\n{text}"
+
+def extract_text_from_pdf(pdf_path: str, max_workers: int = 1) -> str:
+    return "".join(_page_block(page_no, text) for page_no, text in iter_pages(pdf_path, max_workers))
+
+def segment_pdf(pdf_path: str, chunk_size: int, max_workers: int = 1,
+                executor: Optional[ProcessPoolExecutor] = None) -> Dict[str, str]:
+    """Stream PDF pages through the segmenter, keeping only the text around open sections"""
+    segmenter = SectionSegmenter(chunk_size=chunk_size)
+    for page_no, text in iter_pages(pdf_path, max_workers, executor):
+        segmenter.feed(_page_block(page_no, text))
+    return segmenter.close()
+
 def save_json(output_path: str, data: Dict[str, Any]):
     """Save extracted data to JSON file"""
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    write_json_atomic(output_path, data, option=orjson.OPT_NON_STR_KEYS)
     logger.info("Saved extracted data to %s", output_path)
 
-async def main(pdf_path: str, output_path: str) -> Dict[str, Any]:
-    """Main process orchestration"""
+async def _extract_key_metrics(llm_client: LLMClient, sections: Dict[str, str], config: Dict[str, Any]) -> Dict[str, Any]:
+    prompt_config = config['prompts']
+    prompt_input = load_yaml(prompt_config['file'])[prompt_config['key']]
+    extractor = Extractor(llm_client, sections, max_concurrency=config['llm'].get('max_concurrency', 4))
+    if prompt_config.get('batched', False):
+        batch_prompt = load_yaml(prompt_config['file'])[prompt_config['batch_key']]
+        return await extractor.extract_batched(batch_prompt=batch_prompt, prompt_input=prompt_input, sections=sections, temperature=prompt_config.get('temperature', 0.1))
+    return await extractor.extract(prompt_input=prompt_input, sections=sections, temperature=prompt_config.get('temperature', 0.1))
+
+async def main(pdf_path: str, output_path: str, llm_client: Optional[LLMClient] = None,
+               page_pool: Optional[ProcessPoolExecutor] = None) -> Dict[str, Any]:
+    """Main process orchestration. Pass `llm_client` / `page_pool` to share them across runs."""
     config = load_config()
     logger.info("Starting Financial Statement Extraction Pipeline")
     logger.debug("Initiate LLM client with config keys: %s", list(config))
-    llm_client = LLMClient(config['llm'])
-
-    logger.info("Extracting text from PDF: %s", pdf_path)
-    text = extract_text_from_pdf(pdf_path)
-
-    logger.info("Segmenting and categorizing financial sections")
-    sections = SectionSegmenter(text, chunk_size=config['section_segmenter']['chunk_size'])()
+    logger.info("Extracting and segmenting financial sections from PDF: %s", pdf_path)
+    sections = await asyncio.to_thread(segment_pdf, pdf_path, config['section_segmenter']['chunk_size'],
+                                       config.get('pdf_extractor', {}).get('max_workers', 1), page_pool)
 
     logger.info("Extracting key metrics per section using LLM model %s", config['llm']['model'])
-    extractor = Extractor(llm_client, sections)
-    prompt_config = config['prompts']
-    prompt_input = load_yaml(prompt_config['file'])[prompt_config['key']]
-    key_metrics = await extractor.extract(prompt_input=prompt_input, sections=sections, temperature=prompt_config.get('temperature', 0.1))
+    if llm_client is None:
+        async with LLMClient(config['llm']) as client:
+            key_metrics = await _extract_key_metrics(client, sections, config)
+    else:
+        key_metrics = await _extract_key_metrics(llm_client, sections, config)
 
     result = {
         "source_file": Path(pdf_path).name,
@@ -60,23 +144,57 @@ async def main(pdf_path: str, output_path: str) -> Dict[str, Any]:
     save_json(output_path, result)
     return result
 
+async def main_bulk(pdf_paths: List[str], output_dir: str) -> List[Any]:
+    """Run the pipeline for several PDFs concurrently, coalescing their LLM calls in one BatchingLLMClient"""
+    config = load_config()
+    output_paths = [str(Path(output_dir) / f"{Path(pdf_path).stem}.json") for pdf_path in pdf_paths]
+    collisions = {path: [pdf for pdf, out in zip(pdf_paths, output_paths) if out == path]
+                  for path, count in Counter(output_paths).items() if count > 1}
+    if collisions:
+        details = "; ".join(f"{path} <- {', '.join(pdfs)}" for path, pdfs in collisions.items())
+        raise ValueError(f"Several PDFs would write the same report: {details}")
+
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    max_workers = config.get('pdf_extractor', {}).get('max_workers', 1) or 1
+    # one shared pool for all PDFs instead of a pool (and its interpreter start-up) per PDF
+    with (make_page_pool(max_workers) if max_workers > 1 else nullcontext()) as page_pool:
+        async with BatchingLLMClient(config['llm']) as llm_client:
+            results = await asyncio.gather(
+                *(main(pdf_path, output_path, llm_client=llm_client, page_pool=page_pool)
+                  for pdf_path, output_path in zip(pdf_paths, output_paths)),
+                return_exceptions=True,
+            )
+    for pdf_path, result in zip(pdf_paths, results):
+        if isinstance(result, Exception):
+            logger.error("Pipeline failed for %s: %s", pdf_path, result)
+    return results
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
     parser = argparse.ArgumentParser(description='Extract financial data from PDF statements')
-    parser.add_argument('--pdf', type=str, required=True, help='Path to PDF file')
+    parser.add_argument('--pdf', type=str, nargs='+', required=True,
+                        help='Path to PDF file (several paths run in bulk with a shared batching LLM client)')
     parser.add_argument('--output', type=str, default='report.json',
                         help='Output JSON file path (default: report.json)')
+    parser.add_argument('--output-dir', type=str, default='.',
+                        help='Output directory for <pdf name>.json reports when several PDFs are given (default: .)')
 
     args = parser.parse_args()
-    pdf_path = args.pdf
+    pdf_paths = args.pdf
     output_path = args.output
 
     try:
-        result = asyncio.run(main(pdf_path, output_path))
+        if len(pdf_paths) > 1:
+            results = asyncio.run(main_bulk(pdf_paths, args.output_dir))
+            failed = sum(isinstance(result, Exception) for result in results)
+            if failed:
+                logger.error("Pipeline failed for %d of %d PDFs", failed, len(pdf_paths))
+                sys.exit(1)
+        else:
+            asyncio.run(main(pdf_paths[0], output_path))
         logger.info("Pipeline finished successfully")
-        logger.debug("Result: %s", json.dumps(result, indent=2, ensure_ascii=False))
     except Exception as exc:
         logger.exception("Pipeline failed: %s", exc)
         raise
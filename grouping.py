@@ -1,5 +1,83 @@
-import json
-from typing import Dict, Any
+import orjson
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+from src.jsonio import write_json_atomic
+
+# === SECTION WALKERS: yield (item_name, item_data) pairs from a section payload ===
+def _walk_flat(section_data: Any) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Items stored directly under the section, e.g. {"Cash": {...}}"""
+    if isinstance(section_data, dict):
+        for name, item in section_data.items():
+            if isinstance(item, dict):
+                yield name, item
+
+
+def _walk_nested(section_data: Dict[str, Any], include_lists: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Items grouped one level down, e.g. {"Arus kas dari aktivitas operasi": {"Cash receipts": {...}}}"""
+    for key, item_data in section_data.items():
+        if isinstance(item_data, dict):
+            for sub_name, sub_item in item_data.items():
+                if isinstance(sub_item, dict) and "current_year" in sub_item:
+                    yield sub_name, sub_item
+        elif include_lists and isinstance(item_data, list):
+            for sub_item in item_data:
+                if isinstance(sub_item, dict):
+                    yield sub_item.get("name", key), sub_item
+
+
+def _walk_profit_or_loss(section_data: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    return _walk_nested(section_data, include_lists=True)
+
+
+def _walk_items(section_data: Any) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Named item list, either bare or under an "items" key"""
+    if isinstance(section_data, dict) and "items" in section_data:
+        items = section_data["items"]
+    elif isinstance(section_data, list):
+        items = section_data
+    else:
+        return
+    for item in items:
+        if isinstance(item, dict):
+            yield item["name"], item
+
+
+# === ROUTERS: resolve the grouped-dict path an item belongs to ===
+@lru_cache(maxsize=None)
+def _classify_balance_hint(hint: str) -> Tuple[str, ...]:
+    """Hints come from a small fixed vocabulary, so each distinct hint is scanned only once"""
+    if "Asset" in hint:
+        return ("Assets", "Current") if "Current" in hint else ("Assets", "Non-current")
+    if "Liabilit" in hint:
+        return ("Liabilities", "Current") if "Current" in hint else ("Liabilities", "Non-current")
+    if "Equity" in hint:
+        return ("Equity",)
+    return ("Other Indicators",)
+
+
+def _route_balance(item_name: str, item_data: Dict[str, Any]) -> Tuple[str, ...]:
+    """Balance sheet items are routed by category_hint (Assets & Liabilities)"""
+    hint = item_data.get("category_hint", "")
+    if not isinstance(hint, str):
+        return ("Other Indicators",)
+    return _classify_balance_hint(hint)
+
+
+def _route_to(*path: str) -> Callable[[str, Dict[str, Any]], Tuple[str, ...]]:
+    return lambda item_name, item_data: path
+
+
+SectionRoute = Tuple[Callable[[Any], Iterable[Tuple[str, Dict[str, Any]]]],
+                     Callable[[str, Dict[str, Any]], Tuple[str, ...]]]
+
+SECTION_ROUTES: Dict[str, SectionRoute] = {
+    "Statement of financial position": (_walk_flat, _route_balance),
+    "Statement of profit or loss": (_walk_profit_or_loss, _route_to("Income Statement Items")),
+    "Statement of changes in equity": (_walk_items, _route_to("Equity")),
+    "Statement of cash flows": (_walk_nested, _route_to("Other Indicators")),
+}
+GENERIC_ROUTE: SectionRoute = (_walk_flat, _route_to("Other Indicators"))
+
 
 class FinancialStatementGrouper:
     """
@@ -15,8 +93,8 @@ class FinancialStatementGrouper:
         self.data = self._load_json()
 
     def _load_json(self) -> Dict[str, Any]:
-        with open(self.json_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(self.json_path, "rb") as f:
+            return orjson.loads(f.read())
 
     def group_items(self) -> Dict[str, Any]:
         grouped = {
@@ -28,86 +106,17 @@ class FinancialStatementGrouper:
         }
 
         for section, content in self.data["key_metrics_by_section"].items():
-            if section == "Statement of financial position":
-                self._process_financial_position(content, grouped)
-            elif section == "Statement of profit or loss":
-                self._process_profit_or_loss(content, grouped)
-            elif section == "Statement of changes in equity":
-                self._process_equity_section(content, grouped)
-            elif section == "Statement of cash flows":
-                self._process_cash_flows(content, grouped)
-            else:
-                self._process_generic(content, grouped)
+            walk, route = SECTION_ROUTES.get(section, GENERIC_ROUTE)
+            for item_name, item_data in walk(content):
+                bucket = grouped
+                for key in route(item_name, item_data):
+                    bucket = bucket[key]
+                bucket[item_name] = item_data
 
         return grouped
 
-    # === SECTION HANDLERS ===
-    def _process_financial_position(self, section_data: Dict[str, Any], grouped: Dict[str, Any]):
-        """Handle balance sheet items (Assets & Liabilities)"""
-        for item_name, item_data in section_data.items():
-            if not isinstance(item_data, dict):
-                continue
-            hint = item_data.get("category_hint", "")
-            if "Asset" in hint:
-                if "Current" in hint:
-                    grouped["Assets"]["Current"][item_name] = item_data
-                else:
-                    grouped["Assets"]["Non-current"][item_name] = item_data
-            elif "Liabilit" in hint:
-                if "Current" in hint:
-                    grouped["Liabilities"]["Current"][item_name] = item_data
-                else:
-                    grouped["Liabilities"]["Non-current"][item_name] = item_data
-            elif "Equity" in hint:
-                grouped["Equity"][item_name] = item_data
-            else:
-                grouped["Other Indicators"][item_name] = item_data
-
-    def _process_profit_or_loss(self, section_data: Dict[str, Any], grouped: Dict[str, Any]):
-        """Handle Income Statement items"""
-        for key, item_data in section_data.items():
-            if isinstance(item_data, dict):
-                # handle nested dicts like "statement_of_profit_or_loss_and_other_comprehensive_income"
-                for sub_name, sub_item in item_data.items():
-                    if isinstance(sub_item, dict) and "current_year" in sub_item:
-                        grouped["Income Statement Items"][sub_name] = sub_item
-            elif isinstance(item_data, list):
-                for sub_item in item_data:
-                    if isinstance(sub_item, dict):
-                        grouped["Income Statement Items"][sub_item.get("name", key)] = sub_item
-
-    def _process_equity_section(self, section_data: Any, grouped: Dict[str, Any]):
-        """Handle equity statement"""
-        if isinstance(section_data, dict) and "items" in section_data:
-            for item in section_data["items"]:
-                if isinstance(item, dict):
-                    grouped["Equity"][item["name"]] = item
-        elif isinstance(section_data, list):
-            for item in section_data:
-                if isinstance(item, dict):
-                    grouped["Equity"][item["name"]] = item
-
-    def _process_cash_flows(self, section_data: Dict[str, Any], grouped: Dict[str, Any]):
-        """Handle Cash Flow items"""
-        for key, item_data in section_data.items():
-            if isinstance(item_data, dict):
-                # if nested (e.g. Arus kas dari aktivitas operasi)
-                for sub_name, sub_item in item_data.items():
-                    if isinstance(sub_item, dict) and "current_year" in sub_item:
-                        grouped["Other Indicators"][sub_name] = sub_item
-            elif isinstance(item_data, dict) and "current_year" in item_data:
-                grouped["Other Indicators"][key] = item_data
-
-    def _process_generic(self, section_data: Dict[str, Any], grouped: Dict[str, Any]):
-        """Fallback handler for any unclassified section"""
-        if isinstance(section_data, dict):
-            for name, item in section_data.items():
-                if isinstance(item, dict):
-                    grouped["Other Indicators"][name] = item
-
     def save_grouped_json(self, output_path: str, data: Dict[str, Any]):
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        write_json_atomic(output_path, data, option=orjson.OPT_NON_STR_KEYS)
         print(f"✅ Grouped financial data saved to {output_path}")
 
 # === MAIN EXECUTION ===
@@ -115,4 +124,4 @@ if __name__ == "__main__":
     grouper = FinancialStatementGrouper("report_2.json")
     grouped_result = grouper.group_items()
     grouper.save_grouped_json("grouped_report_v3.json", grouped_result)
-    print(json.dumps(grouped_result, indent=2, ensure_ascii=False))
+    print(orjson.dumps(grouped_result, option=orjson.OPT_INDENT_2).decode())
@@ -1,9 +1,17 @@
+import functools
 import yaml
-    
+
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+@functools.lru_cache(maxsize=None)
 def load_config(config_path: str = "./src/config.yaml") -> dict:
+    """Load the pipeline configuration; parsed once per path and shared, so treat it as read-only"""
     try:
         with open(config_path, "r") as f:
-            config_data = yaml.safe_load(f)
+            config_data = yaml.load(f, Loader=_Loader)
         return config_data
     except FileNotFoundError:
-        raise FileNotFoundError(f"Configuration file not found at: {config_path}")
\ No newline at end of file
+        raise FileNotFoundError(f"Configuration file not found at: {config_path}")
@@ -1,11 +1,19 @@
+import asyncio
 import logging
 import re
-import json
+import msgspec
+import orjson
+import partial_json_parser
 from typing import Dict, Any
 from src.llm_client import LLMClient
+from src.schemas import SectionPayload
 
 logger = logging.getLogger(__name__)
 
+_NUM_COMMA_RE = re.compile(r'(\d),(\d)')
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+_NONE_RE = re.compile(r'\bNone\b', re.IGNORECASE)
+
 
 class Extractor:
     """
@@ -17,35 +25,138 @@ class Extractor:
     - Validation & structured JSON output
     """
 
-    def __init__(self, llm_client: LLMClient, sections: Dict[str, str]):
+    def __init__(self, llm_client: LLMClient, sections: Dict[str, str], max_concurrency: int = 4):
         self.llm_client = llm_client
         self.sections = sections
+        self.max_concurrency = max_concurrency
 
     def _clean_json_text(self, text: str) -> str:
         """Clean common formatting issues from LLM JSON responses"""
-        text = re.sub(r'(\d),(\d)', r'\1\2', text)
-        text = re.sub(r',(\s*[}\]])', r'\1', text)
-        text = re.sub(r'\bNone\b', 'null', text, flags=re.IGNORECASE)
+        text = _NUM_COMMA_RE.sub(r'\1\2', text)
+        text = _TRAILING_COMMA_RE.sub(r'\1', text)
+        text = _NONE_RE.sub('null', text)
         return text
-    
-    async def extract(self, prompt_input: str, sections: Dict[str, str], temperature: float = 0.1) -> Dict[str, Any]:
-        """Extract key metrics for each financial section"""
-        results = {}
 
-        for category, text in sections.items():
+    def _parse_json(self, text: str, allow_partial: bool = True) -> Any:
+        """
+        Parse an LLM JSON response, trying progressively more tolerant strategies:
+        strict parsing, regex cleanup, then partial parsing of truncated output.
+        With a structured-output `format` configured on the client, the strict parse is expected to succeed.
+        Raises ValueError if nothing can be recovered.
+        """
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+
+        cleaned = self._clean_json_text(text)
+        try:
+            return orjson.loads(cleaned)
+        except orjson.JSONDecodeError:
+            if not allow_partial:
+                raise
+
+        parsed = partial_json_parser.loads(cleaned)
+        logger.warning("Recovered partial JSON from truncated LLM response")
+        return parsed
+
+    def _is_complete_json(self, text: str) -> bool:
+        """Whether a response parses without partial recovery, i.e. is worth caching"""
+        try:
+            self._parse_json(text, allow_partial=False)
+        except ValueError:
+            return False
+        return True
+
+    def _validate_section(self, parsed: Any) -> Any:
+        """Normalize a flat {item: {current_year, previous_year, category_hint}} payload against SectionItem"""
+        try:
+            return msgspec.to_builtins(msgspec.convert(parsed, type=SectionPayload, strict=False))
+        except msgspec.ValidationError:
+            # nested statement layouts (grouped sub-items, item lists) are kept as returned
+            return parsed
+
+    def _items_by_name(self, parsed: Any) -> Any:
+        """Key a list of {"name": ..., ...} items by name, the shape the per-section prompt yields"""
+        if not isinstance(parsed, list) or not all(
+                isinstance(item, dict) and isinstance(item.get("name"), str) for item in parsed):
+            return parsed
+        return {item["name"]: {key: value for key, value in item.items() if key != "name"} for item in parsed}
+
+    def _decode_section(self, text: str) -> Any:
+        """Decode and validate a section response in one pass, falling back to the tolerant parser"""
+        try:
+            return msgspec.to_builtins(msgspec.json.decode(text, type=SectionPayload, strict=False))
+        except msgspec.DecodeError:
+            return self._validate_section(self._parse_json(text))
+
+    async def _handle_section(self, semaphore: asyncio.Semaphore, category: str, text: str,
+                              prompt_input: str, temperature: float) -> Dict[str, Any]:
+        """Prompt the LLM for a single section and parse its JSON response"""
+        async with semaphore:
             logger.info("Extracting key metrics for: %s", category)
             prompt = prompt_input.format(sections=category, text=text)
             response = await self.llm_client.generate(prompt=prompt,
-                                                      temperature=temperature)
-            cleaned = self._clean_json_text(response)
-            
-            try:
-                parsed = json.loads(cleaned)
-                if "metrics" in parsed and isinstance(parsed["metrics"], dict):
-                    parsed["validation"] = self.validate_metrics(parsed["metrics"])
-                results[category] = parsed
-            except json.JSONDecodeError:
-                logger.warning("Invalid JSON returned for %s (first 200 chars): %s", category, (response or '')[:200])
-                results[category] = {"error": "Invalid JSON", "raw": response}
+                                                      temperature=temperature,
+                                                      cache_if=self._is_complete_json)
+        try:
+            return self._decode_section(response or "")
+        except ValueError:
+            logger.warning("Invalid JSON returned for %s (first 200 chars): %s", category, (response or '')[:200])
+            return {"error": "Invalid JSON", "raw": response}
+
+    async def extract(self, prompt_input: str, sections: Dict[str, str], temperature: float = 0.1) -> Dict[str, Any]:
+        """Extract key metrics for each financial section concurrently"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [self._handle_section(semaphore, category, text, prompt_input, temperature)
+                 for category, text in sections.items()]
+        responses = await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = {}
+        for category, response in zip(sections, responses):
+            if isinstance(response, Exception):
+                logger.error("Extraction failed for %s: %s", category, response)
+                results[category] = {"error": "Request failed", "detail": str(response)}
+            else:
+                results[category] = response
 
         return results
+
+    async def extract_batched(self, batch_prompt: str, prompt_input: str, sections: Dict[str, str],
+                              temperature: float = 0.1) -> Dict[str, Any]:
+        """
+        Extract key metrics for all sections with a single LLM request.
+        Sections missing from the response (or a failed request or unparsable response) fall back to per-section extraction.
+        """
+        if not sections:
+            return {}
+
+        logger.info("Extracting key metrics for %d sections in one request", len(sections))
+        text = "\n".join(f"=== SECTION: {category} ===\n{section_text}" for category, section_text in sections.items())
+        prompt = batch_prompt.format(sections=", ".join(sections), text=text)
+        try:
+            response = await self.llm_client.generate(prompt=prompt,
+                                                      temperature=temperature,
+                                                      cache_if=self._is_complete_json)
+        except Exception as e:
+            # per-section extraction below retries each section and records failures as error entries
+            logger.error("Batched extraction request failed: %s", e)
+            parsed = {}
+        else:
+            try:
+                # a truncated batch would silently drop trailing sections, so only accept complete JSON here
+                parsed = self._parse_json(response or "", allow_partial=False)
+            except ValueError:
+                logger.warning("Invalid JSON returned for batched request (first 200 chars): %s", (response or '')[:200])
+                parsed = {}
+        if not isinstance(parsed, dict):
+            parsed = {}
+
+        results = {category: self._validate_section(self._items_by_name(parsed[category]))
+                   for category in sections if category in parsed}
+        missing = {category: section_text for category, section_text in sections.items() if category not in results}
+        if missing:
+            logger.warning("Falling back to per-section extraction for: %s", ", ".join(missing))
+            results.update(await self.extract(prompt_input=prompt_input, sections=missing, temperature=temperature))
+
+        return {category: results[category] for category in sections}
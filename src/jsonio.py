@@ -0,0 +1,29 @@
+import os
+import secrets
+import orjson
+from typing import Any
+
+
+def write_json_atomic(output_path: str, data: Any, option: int = 0):
+    """
+    Serialize `data` with orjson (2-space indent) to a temporary file in the target
+    directory, then atomically rename it over `output_path`, so readers never see a
+    half-written report. The temp file is created 0666 so the kernel applies the umask,
+    and takes the mode of the file it replaces, if any.
+    """
+    payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE | option)
+    tmp_path = os.path.join(os.path.dirname(output_path) or ".", f".tmp-{secrets.token_hex(8)}.json")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            try:
+                os.fchmod(tmp.fileno(), os.stat(output_path).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            tmp.write(payload)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,35 @@
+import hashlib
+import sqlite3
+import orjson
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+
+class LLMCache:
+    """
+    Content-addressable on-disk cache of LLM responses backed by sqlite.
+    Entries are keyed by a hash of (model, temperature, output format, prompt).
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt: str,
+                 format: Optional[Union[str, Dict[str, Any]]] = None) -> str:
+        format_key = orjson.dumps(format, option=orjson.OPT_SORT_KEYS).decode()
+        return hashlib.blake2b(f"{model}|{temperature}|{format_key}|{prompt}".encode("utf-8"), digest_size=32).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, response: str):
+        self._conn.execute("INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)", (key, response))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
@@ -1,26 +1,232 @@
+import asyncio
+import logging
+import random
+import time
 import aiohttp
-from typing import Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+from src.llm_cache import LLMCache
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
 
 class LLMClient:
     def __init__(self, config: Dict[str, Any]):
         self.api_endpoint = config['url']
         self.model = config['model']
-        
-    async def generate(self, prompt: str, temperature: float = 0.1) -> str:
+        self.timeout = aiohttp.ClientTimeout(total=config.get('timeout_seconds'))
+        self.format = config.get('format')
+        self.max_retries = config.get('retries', 0)
+        self.backoff_factor = config.get('backoff_factor', 0.5)
+        self.max_backoff = config.get('max_backoff_seconds', 30)
+        self.breaker_threshold = config.get('circuit_breaker_threshold', 5)
+        self.breaker_cooldown = config.get('circuit_breaker_cooldown_seconds', 30)
+        self.cache = LLMCache(config['cache_path']) if config.get('cache_path') else None
+        self.connector_limit = 16
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._consecutive_failures = 0
+        self._circuit_open_until = 0.0
+
+    async def __aenter__(self) -> "LLMClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Lazily create a session so the connection pool is reused across calls"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connector_limit, keepalive_timeout=60)
+            )
+        return self._session
+
+    async def aclose(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Transient network failures, timeouts and 429/5xx responses are worth retrying"""
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in RETRYABLE_STATUSES
+        return isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+    def _record_failure(self):
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= self.breaker_threshold:
+            logger.warning("Opening LLM circuit breaker for %ss after %d consecutive failures",
+                           self.breaker_cooldown, self._consecutive_failures)
+            self._circuit_open_until = time.monotonic() + self.breaker_cooldown
+
+    async def _post(self, payload: Dict[str, Any]) -> str:
+        session = self._get_session()
+        async with session.post(self.api_endpoint, json=payload, timeout=self.timeout) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+            return data.get("response", "")
+
+    async def generate(self, prompt: str, temperature: float = 0.1,
+                       format: Optional[Union[str, Dict[str, Any]]] = None,
+                       cache_if: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Generate a completion. `format` constrains the output ("json" or a JSON schema dict)
+        and defaults to the `format` configured for the client.
+        Non-empty responses are cached; pass `cache_if` to cache only responses it accepts
+        (e.g. ones that parse), so a bad generation is not replayed on every rerun.
+        """
+        format = format if format is not None else self.format
+        if self.cache is None:
+            return await self._generate_uncached(prompt, temperature, format)
+
+        key = LLMCache.make_key(self.model, temperature, prompt, format)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug("LLM cache hit for %s", key)
+            return cached
+        response = await self._generate_uncached(prompt, temperature, format)
+        if response and (cache_if is None or cache_if(response)):
+            self.cache.set(key, response)
+        return response
+
+    async def _generate_uncached(self, prompt: str, temperature: float,
+                                 format: Optional[Union[str, Dict[str, Any]]]) -> str:
+        if time.monotonic() < self._circuit_open_until:
+            raise Exception("API request failed: circuit breaker is open")
+
         payload = {
             "model": self.model,
             "prompt": prompt,
             "stream": False,
             "temperature": temperature
         }
-        
+        if format:
+            payload["format"] = format
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._post(payload)
+                self._consecutive_failures = 0
+                return response
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not self._is_retryable(e):
+                    raise Exception(f"API request failed: {str(e) or type(e).__name__}")
+                if attempt == self.max_retries:
+                    self._record_failure()
+                    raise Exception(f"API request failed: {str(e) or type(e).__name__}")
+                delay = min(self.backoff_factor * 2 ** attempt, self.max_backoff) + random.uniform(0, self.backoff_factor)
+                logger.warning("LLM request failed (%s), retrying in %.2fs (attempt %d/%d)",
+                               str(e) or type(e).__name__, delay, attempt + 1, self.max_retries)
+                await asyncio.sleep(delay)
+            except ValueError as e:
+                raise Exception(f"Invalid JSON response: {str(e)}")
+
+
+class BatchingLLMClient(LLMClient):
+    """
+    LLMClient that coalesces near-simultaneous generate() calls, e.g. from several
+    pipeline runs sharing one client. A background task drains the request queue
+    every `batch_interval_ms` and packs up to `max_batch` prompts per batch; each
+    caller's future resolves as soon as its own response arrives.
+    At most `max_batch` requests are in flight across all callers: the drain loop
+    waits for a free slot before dispatching, so requests arriving meanwhile join
+    the next batch instead of piling onto the server (and the connection pool,
+    whose wait counts against the request timeout).
+    Ollama has no native batch endpoint, so a batch is sent as concurrent requests.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        batching = config.get('batching') or {}
+        self.batch_interval = batching.get('batch_interval_ms', 50) / 1000
+        self.max_batch = batching.get('max_batch', 8)
+        self.connector_limit = max(self.connector_limit, self.max_batch)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def generate(self, prompt: str, temperature: float = 0.1,
+                       format: Optional[Union[str, Dict[str, Any]]] = None,
+                       cache_if: Optional[Callable[[str], bool]] = None) -> str:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_batch)
+            self._worker = asyncio.create_task(self._drain())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, temperature, format, cache_if, future))
+        return await future
+
+    async def _next_batch(self, batch: List[Tuple[str, float, Any, Any, asyncio.Future]]):
+        """Fill `batch` in place, so prompts already taken off the queue are visible if cancelled"""
+        loop = asyncio.get_running_loop()
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.batch_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            getter = asyncio.ensure_future(self._queue.get())
+            try:
+                await asyncio.wait((getter,), timeout=remaining)
+            finally:
+                # cancel() fails once the getter holds a prompt, which must not be lost
+                timed_out = getter.cancel()
+                if not timed_out:
+                    batch.append(getter.result())
+            if timed_out:
+                break
+
+    async def _drain(self):
+        while True:
+            batch = []
+            try:
+                await self._next_batch(batch)
+                logger.debug("Dispatching LLM batch of %d prompts", len(batch))
+                while batch:
+                    await self._slots.acquire()
+                    task = asyncio.create_task(self._resolve(*batch.pop(0)))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._inflight.discard)
+            except asyncio.CancelledError:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(Exception("API request failed: client closed"))
+                raise
+
+    async def _resolve(self, prompt: str, temperature: float, format: Any,
+                       cache_if: Optional[Callable[[str], bool]], future: asyncio.Future):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.api_endpoint, json=payload) as resp:
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    return data.get("response", "")
-        except aiohttp.ClientError as e:
-            raise Exception(f"API request failed: {str(e)}")
-        except ValueError as e:
-            raise Exception(f"Invalid JSON response: {str(e)}")
\ No newline at end of file
+            result = await LLMClient.generate(self, prompt, temperature, format, cache_if)
+        except asyncio.CancelledError:
+            if not future.done():
+                future.set_exception(Exception("API request failed: client closed"))
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self._slots.release()
+
+    async def aclose(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            for task in list(self._inflight):
+                task.cancel()
+            await asyncio.gather(self._worker, *self._inflight, return_exceptions=True)
+            while not self._queue.empty():
+                *_, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(Exception("API request failed: client closed"))
+            self._worker = None
+            self._queue = None
+            self._slots = None
+        await super().aclose()
@@ -1,7 +1,15 @@
+import functools
 import yaml
 from pathlib import Path
 
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+@functools.lru_cache(maxsize=None)
 def load_yaml(yaml_file: str = "prompts.yaml") -> dict:
+    """Load a YAML file next to this module; parsed once per file and shared, so treat it as read-only"""
     prompt_file = Path(__file__).parent / yaml_file
     with open(prompt_file, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
\ No newline at end of file
+        return yaml.load(f, Loader=_Loader)
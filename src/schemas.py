@@ -0,0 +1,12 @@
+import msgspec
+from typing import Dict, Optional, Union
+
+
+class SectionItem(msgspec.Struct, forbid_unknown_fields=True):
+    """A single financial line item as returned by the LLM for a flat section"""
+    current_year: Optional[Union[int, float]] = None
+    previous_year: Optional[Union[int, float]] = None
+    category_hint: str = ""
+
+
+SectionPayload = Dict[str, SectionItem]
@@ -2,36 +2,139 @@ import re
 import json
 from typing import Dict, Any
 
+_NEXT_SECTION_RE = re.compile(r'\nStatement of|Laporan|Notes to|Catatan|--- PAGE', re.IGNORECASE)
+_SECTION_RE = re.compile(
+    r'(?P<fp>Statement of financial position|Laporan posisi keuangan)'
+    r'|(?P<pl>Statement of profit or loss|Laporan laba rugi)'
+    r'|(?P<cf>Statement of cash flows|Laporan arus kas)'
+    r'|(?P<eq>Statement of changes in equity|Laporan perubahan ekuitas)',
+    re.IGNORECASE,
+)
+_SECTION_NAMES = {
+    "fp": "Statement of financial position",
+    "pl": "Statement of profit or loss",
+    "cf": "Statement of cash flows",
+    "eq": "Statement of changes in equity",
+}
+# patterns are literal, so a match cut off at the end of the buffer is at most this long
+_SECTION_OVERLAP = max(len(name) for name in _SECTION_NAMES.values())
+_NEXT_SECTION_OVERLAP = len("\nStatement of")
+# the next-section sentinel is searched this far past the section heading
+_HEADING_SKIP = 100
+
 # === SECTION SEGMENTATION & CATEGORIZATION ===
 class SectionSegmenter:
     """
     Segment by statement type and categorize into meaningful financial groups
     (based on Fineksi test requirement)
+
+    Text can be given up front and segmented with __call__, or streamed with
+    feed()/close() so only the window around unfinished sections stays in memory.
     """
 
-    def __init__(self, raw_text: str, chunk_size: int = 5000):
+    def __init__(self, raw_text: str = "", chunk_size: int = 5000):
         self.raw_text = raw_text
         self.chunk_size = chunk_size
+        self._reset()
+
+    def _reset(self):
+        self._buffer = ""
+        self._base = 0          # absolute offset of _buffer[0] in the streamed text
+        self._scan_pos = 0      # absolute offset up to which headings have been searched
+        self._starts: Dict[str, int] = {}
+        self._ends: Dict[str, int] = {}
+        self._sentinel_pos: Dict[str, int] = {}
+        self._done: Dict[str, str] = {}
+
+    @property
+    def _length(self) -> int:
+        return self._base + len(self._buffer)
+
+    def _slice(self, start: int, end: int) -> str:
+        return self._buffer[start - self._base:end - self._base]
+
+    def _scan_headings(self):
+        """Record the first heading of every statement type seen so far"""
+        if len(self._starts) == len(_SECTION_NAMES):
+            return
+        scan_from = max(self._base, self._scan_pos - _SECTION_OVERLAP)
+        for match in _SECTION_RE.finditer(self._buffer, scan_from - self._base):
+            self._starts.setdefault(match.lastgroup, match.start() + self._base)
+            if len(self._starts) == len(_SECTION_NAMES):
+                break
+        self._scan_pos = self._length
+
+    def _resolve_ends(self, final: bool):
+        """
+        Find where each open section ends. The next-section sentinel is searched from
+        _HEADING_SKIP characters past the heading, and the section ends at
+        sentinel - _HEADING_SKIP + chunk_size; with no sentinel it runs to the end of the
+        text. _emit clips the end to the text and yields "" when it is not past the heading.
+        """
+        for group, start in self._starts.items():
+            if group in self._ends:
+                continue
+            offset = start + _HEADING_SKIP
+            search_from = max(offset, self._sentinel_pos.get(group, offset))
+            next_match = None
+            if search_from < self._length:
+                next_match = _NEXT_SECTION_RE.search(self._buffer, search_from - self._base)
+            if next_match:
+                self._ends[group] = next_match.start() + self._base - offset + start + self.chunk_size
+            elif final:
+                self._ends[group] = self._length
+            else:
+                # a sentinel may be cut off at the end of the buffer, so rescan its tail next time
+                self._sentinel_pos[group] = max(offset, self._length - _NEXT_SECTION_OVERLAP)
+
+    def _emit(self, final: bool) -> Dict[str, str]:
+        emitted = {}
+        for group, end in self._ends.items():
+            if group in self._done or (end > self._length and not final):
+                continue
+            start = self._starts[group]
+            text = self._slice(start, min(end, self._length)) if end > start else ""
+            self._done[group] = text
+            emitted[_SECTION_NAMES[group]] = text
+        return emitted
+
+    def _trim(self):
+        """Drop buffered text no open section or heading search can still reach"""
+        keep = self._length
+        if len(self._starts) < len(_SECTION_NAMES):
+            keep = min(keep, self._scan_pos - _SECTION_OVERLAP)
+        for group, start in self._starts.items():
+            if group not in self._done:
+                keep = min(keep, start)
+        if keep > self._base:
+            self._buffer = self._buffer[keep - self._base:]
+            self._base = keep
+
+    def _advance(self, final: bool) -> Dict[str, str]:
+        self._scan_headings()
+        self._resolve_ends(final)
+        emitted = self._emit(final)
+        self._trim()
+        return emitted
 
-    def _extract_section(self, pattern: str) -> str:
-        match = re.search(pattern, self.raw_text, re.IGNORECASE)
-        if not match:
-            return ""
-        start = match.start()
-        next_match = re.search(r'\nStatement of|Laporan|Notes to|Catatan|--- PAGE', self.raw_text[start + 100:], re.IGNORECASE)
-        end = next_match.start() + start + self.chunk_size if next_match else len(self.raw_text)
-        return self.raw_text[start:end]
+    def feed(self, text: str) -> Dict[str, str]:
+        """Append streamed text (e.g. one PDF page); returns the sections completed by it"""
+        if len(self._done) == len(_SECTION_NAMES):
+            return {}
+        self._buffer += text
+        return self._advance(final=False)
+
+    def close(self) -> Dict[str, str]:
+        """Finish the stream; returns all non-empty sections in statement order"""
+        self._advance(final=True)
+        sections = {name: self._done[group] for group, name in _SECTION_NAMES.items() if group in self._done}
+        return {k: v for k, v in sections.items() if v.strip()}
 
     def __call__(self) -> Dict[str, str]:
         """
         Segment by statement type and categorize into meaningful financial groups
         (based on Fineksi test requirement)
         """
-        sections = {
-            "Statement of financial position": self._extract_section("Statement of financial position|Laporan posisi keuangan"),
-            "Statement of profit or loss": self._extract_section("Statement of profit or loss|Laporan laba rugi"),
-            "Statement of cash flows": self._extract_section("Statement of cash flows|Laporan arus kas"),
-            "Statement of changes in equity": self._extract_section("Statement of changes in equity|Laporan perubahan ekuitas"),
-        }
-
-        return {k: v for k, v in sections.items() if v.strip()}
+        self._reset()
+        self.feed(self.raw_text)
+        return self.close()
@@ -0,0 +1,55 @@
+import asyncio
+import unittest
+
+from src.llm_client import BatchingLLMClient
+
+
+class _FakeBatchingClient(BatchingLLMClient):
+    """Answers every prompt after `delay` seconds without touching the network"""
+
+    delay = 0.05
+
+    async def _post(self, payload):
+        await asyncio.sleep(self.delay)
+        return payload["prompt"]
+
+
+def _client(max_batch: int = 3, batch_interval_ms: int = 200) -> _FakeBatchingClient:
+    return _FakeBatchingClient({
+        "url": "http://localhost:11434/api/generate",
+        "model": "test",
+        "batching": {"batch_interval_ms": batch_interval_ms, "max_batch": max_batch},
+    })
+
+
+class BatchingLLMClientTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_generate_resolves_every_prompt(self):
+        async with _client() as client:
+            results = await asyncio.gather(*(client.generate(f"p{i}") for i in range(7)))
+        self.assertEqual(results, [f"p{i}" for i in range(7)])
+
+    async def test_aclose_fails_half_collected_batch(self):
+        client = _client()
+        calls = [asyncio.ensure_future(client.generate("p0"))]
+        # let the worker take p0 off the queue and start waiting for the rest of the batch
+        await asyncio.sleep(0.05)
+        await client.aclose()
+        results = await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), 1)
+        self.assertEqual([str(r) for r in results], ["API request failed: client closed"])
+
+    async def test_aclose_settles_every_caller(self):
+        client = _client()
+        calls = [asyncio.ensure_future(client.generate(f"p{i}")) for i in range(7)]
+        await asyncio.sleep(0.1)
+        await client.aclose()
+        results = await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), 1)
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                self.assertEqual(str(result), "API request failed: client closed")
+            else:
+                self.assertEqual(result, f"p{i}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import random
+import unittest
+
+from src.section_segmenter import SectionSegmenter, _NEXT_SECTION_RE, _SECTION_NAMES, _SECTION_RE
+
+# fragments the random texts are built from: every heading and sentinel, in a few casings
+_HEADINGS = [
+    "Statement of financial position", "Laporan posisi keuangan",
+    "Statement of profit or loss", "Laporan laba rugi",
+    "Statement of cash flows", "Laporan arus kas",
+    "Statement of changes in equity", "Laporan perubahan ekuitas",
+]
+_SENTINELS = ["\nStatement of", "Laporan", "Notes to", "Catatan", "--- PAGE 3 ---"]
+_FILLER = "Cash and cash equivalents 1,234 5,678\nTotal assets "
+
+
+def _baseline_sections(raw_text: str, chunk_size: int):
+    """The original whole-text algorithm the streaming segmenter must reproduce"""
+    starts = {}
+    for match in _SECTION_RE.finditer(raw_text):
+        starts.setdefault(match.lastgroup, match.start())
+    sections = {}
+    for group, name in _SECTION_NAMES.items():
+        if group not in starts:
+            continue
+        start = starts[group]
+        offset = start + 100
+        next_match = _NEXT_SECTION_RE.search(raw_text, offset)
+        end = next_match.start() - offset + start + chunk_size if next_match else len(raw_text)
+        sections[name] = raw_text[start:end]
+    return {k: v for k, v in sections.items() if v.strip()}
+
+
+def _random_case(rng: random.Random, text: str) -> str:
+    choice = rng.random()
+    if choice < 0.2:
+        return text.upper()
+    if choice < 0.4:
+        return text.lower()
+    return text
+
+
+def _random_text(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(0, 40)):
+        kind = rng.random()
+        if kind < 0.25:
+            parts.append(_random_case(rng, rng.choice(_HEADINGS)))
+        elif kind < 0.45:
+            parts.append(_random_case(rng, rng.choice(_SENTINELS)))
+        else:
+            start = rng.randrange(len(_FILLER))
+            parts.append((_FILLER * 20)[start:start + rng.randint(1, 400)])
+    return "".join(parts)
+
+
+def _random_chunks(rng: random.Random, text: str):
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 12))))
+    bounds = [0] + cuts + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+class SectionSegmenterTest(unittest.TestCase):
+
+    def test_streaming_matches_baseline(self):
+        rng = random.Random(20241014)
+        for _ in range(2000):
+            text = _random_text(rng)
+            chunk_size = rng.choice([0, 1, 50, 99, 100, 101, 250, 5000])
+            expected = _baseline_sections(text, chunk_size)
+
+            self.assertEqual(SectionSegmenter(text, chunk_size)(), expected)
+
+            segmenter = SectionSegmenter(chunk_size=chunk_size)
+            emitted = {}
+            for chunk in _random_chunks(rng, text):
+                emitted.update(segmenter.feed(chunk))
+            result = segmenter.close()
+            self.assertEqual(result, expected)
+            # sections handed out early by feed() are final
+            for name, section in emitted.items():
+                if name in result:
+                    self.assertEqual(section, result[name])
+
+    def test_sentinel_split_across_chunks(self):
+        text = "Statement of cash flows" + "x" * 120 + "\nStatement of" + "y" * 300
+        expected = _baseline_sections(text, 50)
+        cut = text.index("\nStatement of") + 5
+        segmenter = SectionSegmenter(chunk_size=50)
+        segmenter.feed(text[:cut])
+        segmenter.feed(text[cut:])
+        self.assertEqual(segmenter.close(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -33,55 +33,62 @@ Output:
     - Saves detailed results to 'comparison_result.json'
 """
 
-import json
+import orjson
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 import math
 import numpy as np
+from src.jsonio import write_json_atomic
 
 '''
 
 '''
 
 def load_json(path: str) -> Dict[str, Any]:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def extract_amounts(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
-    """Ambil hanya nilai numerik dari current_year / previous_year"""
-    result = {}
-    if isinstance(data, dict):
-        for k, v in data.items():
-            key_path = f"{prefix}.{k}" if prefix else k
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def extract_amounts(data: Dict[str, Any], prefix: str = "") -> Tuple[np.ndarray, np.ndarray]:
+    """Ambil hanya nilai numerik dari current_year / previous_year sebagai array (keys, values) yang terurut"""
+    keys = []
+    values = []
+    stack = [(prefix, data)]
+    while stack:
+        node_prefix, node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        for k, v in node.items():
+            key_path = f"{node_prefix}.{k}" if node_prefix else k
             if k in ("current_year", "previous_year") and isinstance(v, (int, float)):
-                result[key_path] = v
+                keys.append(key_path)
+                values.append(v)
             elif isinstance(v, dict):
-                result.update(extract_amounts(v, key_path))
+                stack.append((key_path, v))
             elif isinstance(v, list):
-                for i, item in enumerate(v):
-                    result.update(extract_amounts(item, f"{key_path}[{i}]"))
-    return result
+                stack.extend((f"{key_path}[{i}]", item) for i, item in enumerate(v))
 
+    key_arr = np.array(keys, dtype=str)
+    order = np.argsort(key_arr, kind="stable")
+    return key_arr[order], np.array(values, dtype=np.float64)[order]
 
-def compute_metrics(base: Dict[str, float], target: Dict[str, float]) -> Dict[str, float]:
-    common_keys = sorted(set(base.keys()) & set(target.keys()))
-    if not common_keys:
-        return {}
 
-    y_true = np.array([base[k] for k in common_keys])
-    y_pred = np.array([target[k] for k in common_keys])
+def compute_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+    n = len(y_true)
+    if not n:
+        return {}
 
     diff = y_pred - y_true
     abs_diff = np.abs(diff)
-    abs_pct_diff = np.abs(diff / np.where(y_true != 0, y_true, np.nan)) * 100
+    nonzero = y_true != 0
 
-    mae = np.nanmean(abs_diff)
-    mape = np.nanmean(abs_pct_diff)
-    rmse = math.sqrt(np.nanmean(diff ** 2))
-    r2 = 1 - np.nanmean((diff) ** 2) / np.nanmean((y_true - np.nanmean(y_true)) ** 2)
+    mae = abs_diff.mean()
+    mse = np.dot(diff, diff) / n
+    mape = (abs_diff[nonzero] / np.abs(y_true[nonzero])).mean() * 100 if nonzero.any() else np.nan
+    rmse = math.sqrt(mse)
+    r2 = 1 - mse / y_true.var()
 
-    accuracy = (np.sum(abs_diff == 0) / len(common_keys)) * 100
+    accuracy = (np.count_nonzero(abs_diff == 0) / n) * 100
 
     return {
         "Accuracy (%)": round(accuracy, 2),
@@ -96,22 +103,23 @@ def compare_and_score(your_file: str, my_file: str):
     yours = load_json(your_file)
     mine = load_json(my_file)
 
-    base = extract_amounts(yours)
-    target = extract_amounts(mine)
+    base_keys, base_values = extract_amounts(yours)
+    target_keys, target_values = extract_amounts(mine)
 
-    missing_in_target = sorted(set(base.keys()) - set(target.keys()))
-    missing_in_base = sorted(set(target.keys()) - set(base.keys()))
+    common_keys, base_idx, target_idx = np.intersect1d(base_keys, target_keys, return_indices=True)
+    missing_in_target = np.setdiff1d(base_keys, target_keys).tolist()
+    missing_in_base = np.setdiff1d(target_keys, base_keys).tolist()
 
-    metrics = compute_metrics(base, target)
+    metrics = compute_metrics(base_values[base_idx], target_values[target_idx])
 
     result = {
         "summary": {
-            "total_fields_mine": len(base),
-            "total_fields_gpt": len(target),
-            "common_fields": len(set(base.keys()) & set(target.keys())),
+            "total_fields_mine": len(base_keys),
+            "total_fields_gpt": len(target_keys),
+            "common_fields": len(common_keys),
             "missing_in_mine": len(missing_in_base),
             "missing_in_gpt": len(missing_in_target),
-            "missing_rate (%)": round(((len(missing_in_target) + len(missing_in_base)) / (len(base) + len(target)) * 100), 2)
+            "missing_rate (%)": round(((len(missing_in_target) + len(missing_in_base)) / (len(base_keys) + len(target_keys)) * 100), 2)
         },
         "metrics": metrics,
         "missing_in_mine": missing_in_base,
@@ -119,10 +127,9 @@ def compare_and_score(your_file: str, my_file: str):
     }
 
     print("\n=== NUMERIC COMPARISON SUMMARY ===")
-    print(json.dumps(result, indent=2, ensure_ascii=False))
+    print(orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY).decode())
 
-    with open("validation_comparison_report.json", "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+    write_json_atomic("validation_comparison_report.json", result, option=orjson.OPT_SERIALIZE_NUMPY)
     print("\n📁 comparison_metrics_result.json saved.")
 
 
@@ -1,5 +1,6 @@
-import json
+import orjson
 from typing import Dict, Any
+from src.jsonio import write_json_atomic
 
 class FinancialReportValidator:
     """
@@ -11,8 +12,8 @@ class FinancialReportValidator:
         self.data = self._load_json()
 
     def _load_json(self) -> Dict[str, Any]:
-        with open(self.json_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(self.json_path, "rb") as f:
+            return orjson.loads(f.read())
 
     def _safe_sum(self, items: Dict[str, Any]) -> float:
         """Safely sum numeric values, ignoring None or invalid data."""
@@ -89,8 +90,7 @@ class FinancialReportValidator:
         return result
 
     def save_validation_report(self, output_path: str, validation_result: Dict[str, Any]):
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(validation_result, f, indent=2, ensure_ascii=False)
+        write_json_atomic(output_path, validation_result, option=orjson.OPT_NON_STR_KEYS)
         print(f"✅ Validation report saved to {output_path}")
 
 
@@ -99,4 +99,4 @@ if __name__ == "__main__":
     validator = FinancialReportValidator("grouped_report.json")
     result = validator.validate()
     validator.save_validation_report("validation_financial_report.json", result)
-    print(json.dumps(result, indent=2, ensure_ascii=False))
+    print(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())